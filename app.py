@@ -1,198 +1,282 @@
+import io
 import os
+import asyncio
 import logging
-import time
 from datetime import datetime
-from slack_bolt import App
-from slack_bolt.adapter.flask import SlackRequestHandler
-from flask import Flask, request
+from aiohttp import ClientSession, TCPConnector, web
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.aiohttp import to_bolt_request, to_aiohttp_response
 from dotenv import load_dotenv
+from matcher import SCAN_EXECUTOR, scan_texts
 
-# Load environment variables
+# Load environment variables, failing at import if the Slack credentials are missing
 load_dotenv()
+SLACK_BOT_TOKEN = os.environ["SLACK_BOT_TOKEN"]
+SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]
 
 # Initialize the Slack app
-slack_app = App(
-    token=os.environ.get("SLACK_BOT_TOKEN"),
-    signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
+slack_app = AsyncApp(
+    token=SLACK_BOT_TOKEN,
+    signing_secret=SLACK_SIGNING_SECRET
 )
 
-# Initialize Flask app for web server
-flask_app = Flask(__name__)
-handler = SlackRequestHandler(slack_app)
+# Initialize aiohttp app for web server
+web_app = web.Application()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Keywords to search for
-KEYWORDS = [
-    'bug',
-    'issue',
-    'problem',
-    'error',
-    'broken',
-    'not working',
-    'failed',
-    'crash',
-    'incident',
-    'urgent',
-    'rattle',
-    'deflation',
-    'detachment',
-    'faulty',
-    'incorrect',
-    'wrong'
-]
+# Message subtypes for membership events, which never describe an issue
+SKIPPED_SUBTYPES = frozenset({"channel_join", "channel_leave"})
+
+# Replies fetched per conversations.replies page, and the most scanned per thread
+REPLIES_PAGE_SIZE = 200
+MAX_THREAD_MESSAGES = 5000
+
+# Most incidents, and characters, in a single summary message. Slack truncates
+# chat.postMessage text beyond 40,000 characters.
+MAX_MESSAGES_PER_POST = 50
+MAX_SUMMARY_CHARS = 39000
+
+# Layout of each incident in the summary message
+SEPARATOR_LINE = "━" * 19 + "\n"
+MESSAGE_TEMPLATE = (
+    SEPARATOR_LINE +
+    "*MESSAGE #{index}* - ({timestamp})\n\n"
+    '"{text}"\n\n'
+    "Keywords: {keywords}\n\n"
+    "<{link}|View message>\n\n"
+)
 
 def format_timestamp(ts):
     """Convert Slack timestamp to readable time"""
     timestamp = datetime.fromtimestamp(float(ts))
     return timestamp.strftime('%I:%M %p')
 
-def find_matching_keywords(text):
-    """Find which keywords are present in the text"""
-    text_lower = text.lower()
-    return [keyword for keyword in KEYWORDS if keyword.lower() in text_lower]
+# Permalink prefix for the workspace, cached after the first successful lookup
+DEFAULT_WORKSPACE = "sportabletech"
+permalink_prefix = None
 
-def get_message_link(client, channel_id, message_ts):
-    """Generate a permalink to a Slack message using Slack API"""
-    try:
-        result = client.chat_getPermalink(
-            channel=channel_id,
-            message_ts=message_ts
-        )
-        return result["permalink"]
-    except Exception as e:
-        # Fallback to manual construction
-        message_id = message_ts.replace('.', '')
-        return f"https://sportabletech.slack.com/archives/{channel_id}/p{message_id}"
+async def get_permalink_prefix(client):
+    """Look up the workspace subdomain and cache its permalink prefix"""
+    global permalink_prefix
+    if permalink_prefix is None:
+        try:
+            workspace = (await client.team_info())["team"]["domain"]
+        except Exception as e:
+            # Not cached, so the next request retries the lookup
+            logging.warning(f"Could not look up workspace domain, using default: {e}")
+            return f"https://{DEFAULT_WORKSPACE}.slack.com/archives/"
+        permalink_prefix = f"https://{workspace}.slack.com/archives/"
+    return permalink_prefix
+
+def get_message_link(prefix, channel_id, message_ts):
+    """Build a permalink to a Slack message without an API round-trip"""
+    return prefix + channel_id + "/p" + message_ts.replace(".", "")
+
+async def scan_page(messages, link_prefix, channel_id):
+    """Return the messages in a page of replies that contain keywords"""
+    texts = [msg.get("text", "") for msg in messages]
+    
+    # Scan off the event loop when the matcher can run without the GIL
+    if SCAN_EXECUTOR is not None:
+        loop = asyncio.get_running_loop()
+        page_keywords = await loop.run_in_executor(SCAN_EXECUTOR, scan_texts, texts)
+    else:
+        page_keywords = scan_texts(texts)
+    
+    return [
+        {
+            "text": text,
+            "user": msg.get("user", "Unknown"),
+            "ts": msg.get("ts"),
+            "keywords": matched_keywords,
+            "link": get_message_link(link_prefix, channel_id, msg.get("ts"))
+        }
+        for msg, text, matched_keywords in zip(messages, texts, page_keywords)
+        if matched_keywords
+    ]
+
+# Keep references to pending deletes so they are not garbage collected
+background_tasks = set()
+
+def delete_message_later(client, channel_id, message_ts, delay):
+    """Delete a message after a delay without blocking the listener"""
+    async def delete():
+        await asyncio.sleep(delay)
+        try:
+            await client.chat_delete(channel=channel_id, ts=message_ts)
+        except Exception as e:
+            logging.error(f"Error deleting message {message_ts}: {e}")
+    
+    task = asyncio.create_task(delete())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
 
 @slack_app.shortcut("extract_thread_issues")
-def handle_extract_issues(ack, shortcut, client, logger):
+async def handle_extract_issues(ack, shortcut, client, logger):
     """Handle the message shortcut to extract issues from thread"""
     # Acknowledge the shortcut request
-    ack()
+    await ack()
     
     try:
         # Get thread and channel info
         thread_ts = shortcut["message"].get("thread_ts") or shortcut["message"]["ts"]
         channel_id = shortcut["channel"]["id"]
         user_id = shortcut["user"]["id"]
-        team_id = shortcut["team"]["id"]
         
-        # Post a loading message
-        loading_msg = client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=thread_ts,
-            text="🔍 Analyzing thread..."
-        )
-        
-        # Fetch all replies in the thread
-        result = client.conversations_replies(
-            channel=channel_id,
-            ts=thread_ts,
-            limit=1000
+        # Post a loading message while fetching the first page of replies
+        loading_msg, replies, link_prefix = await asyncio.gather(
+            client.chat_postMessage(
+                channel=channel_id,
+                thread_ts=thread_ts,
+                text="🔍 Analyzing thread..."
+            ),
+            client.conversations_replies(
+                channel=channel_id,
+                ts=thread_ts,
+                limit=REPLIES_PAGE_SIZE
+            ),
+            get_permalink_prefix(client)
         )
         
-        messages = result.get("messages", [])
-        
-        # Filter messages that contain keywords
+        # Filter messages that contain keywords, scanning each page while the
+        # next one is fetched. Slack repeats the parent message at the top of
+        # every page, so messages already seen are skipped before scanning or counting.
         relevant_messages = []
-        for msg in messages:
-            text = msg.get("text", "")
-            matched_keywords = find_matching_keywords(text)
-            if matched_keywords:
-                message_link = get_message_link(client, channel_id, msg.get("ts"))
-                relevant_messages.append({
-                    "text": text,
-                    "user": msg.get("user", "Unknown"),
-                    "ts": msg.get("ts"),
-                    "keywords": matched_keywords,
-                    "link": message_link
-                })
+        seen_ts = set()
+        scanned_count = 0
+        pending_scan = None
+        async for page in replies:
+            candidates = []
+            for msg in page.get("messages", []):
+                if msg.get("ts") in seen_ts:
+                    continue
+                seen_ts.add(msg.get("ts"))
+                scanned_count += 1
+                if msg.get("subtype") not in SKIPPED_SUBTYPES:
+                    candidates.append(msg)
+            has_more = bool(page.get("response_metadata", {}).get("next_cursor"))
+            
+            # Collect the previous page's hits, then leave this page scanning
+            # while the loop requests the next one
+            if pending_scan is not None:
+                relevant_messages.extend(await pending_scan)
+            pending_scan = asyncio.create_task(scan_page(candidates, link_prefix, channel_id))
+            
+            if scanned_count >= MAX_THREAD_MESSAGES:
+                if has_more:
+                    logger.warning(f"Stopped scanning thread {thread_ts} after {scanned_count} messages")
+                break
+        
+        if pending_scan is not None:
+            relevant_messages.extend(await pending_scan)
         
         # Build output message
         if not relevant_messages:
             # Update loading message to show no issues found
-            client.chat_update(
+            await client.chat_update(
                 channel=channel_id,
                 ts=loading_msg["ts"],
                 text="✅ Analysis complete - No issues found!"
             )
             # Delete after 15 seconds
-            time.sleep(15)
-            client.chat_delete(
-                channel=channel_id,
-                ts=loading_msg["ts"]
-            )
+            delete_message_later(client, channel_id, loading_msg["ts"], 15)
             return
         
         # Build consolidated message with all incidents
-        summary_message = (
+        summary_header = (
             f"Found *{len(relevant_messages)}* message(s) with issue keywords:\n\n"
             f":warning: Summary may not contain all incidents, messages below may not relate to an issue or may be part of the same incident, please review before creating Support Tickets\n\n"
         )
         
-        # Add each incident to the summary message
+        async def post_summary(summary_text):
+            """Post one part of the summary as a single message"""
+            await client.chat_postMessage(
+                channel=channel_id,
+                thread_ts=thread_ts,
+                text=summary_text,
+                unfurl_links = False,
+                unfurl_media = False
+            )
+        
+        # Write each incident into the summary buffer, starting a new message once
+        # it holds MAX_MESSAGES_PER_POST incidents or the next one would take it
+        # past MAX_SUMMARY_CHARS, so long threads stay under Slack's size limit
+        summary_buffer = io.StringIO()
+        summary_buffer.write(summary_header)
+        buffered_chars = len(summary_header)
+        buffered_count = 0
         for index, msg in enumerate(relevant_messages, 1):
-            timestamp = format_timestamp(msg["ts"])
-            keywords_str = ", ".join([f'"{k}"' for k in msg["keywords"]])
-            
-            summary_message += (
-                f"━━━━━━━━━━━━━━━━━━━\n"
-                f"*MESSAGE #{index}* - ({timestamp})\n\n"
-                f'"{msg["text"]}"\n\n'
-                f"Keywords: {keywords_str}\n\n"
-                f"<{msg['link']}|View message>\n\n"
+            entry = MESSAGE_TEMPLATE.format(
+                index=index,
+                timestamp=format_timestamp(msg["ts"]),
+                text=msg["text"],
+                keywords=", ".join([f'"{k}"' for k in msg["keywords"]]),
+                link=msg["link"]
             )
+            if buffered_count and (
+                buffered_count >= MAX_MESSAGES_PER_POST
+                or buffered_chars + len(entry) > MAX_SUMMARY_CHARS
+            ):
+                await post_summary(summary_buffer.getvalue())
+                summary_buffer = io.StringIO()
+                buffered_chars = 0
+                buffered_count = 0
+            summary_buffer.write(entry)
+            buffered_chars += len(entry)
+            buffered_count += 1
         
-        # Post the summary message as a single message
-        client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=thread_ts,
-            text=summary_message,
-            unfurl_links = False,
-            unfurl_media = False
-        )
+        await post_summary(summary_buffer.getvalue())
         
         # Update loading message to completion message
-        client.chat_update(
+        await client.chat_update(
             channel=channel_id,
             ts=loading_msg["ts"],
             text="✅ Analysis complete!"
         )
         
-        # Delete the completion message after 15 seconds
-        time.sleep(30)
-        client.chat_delete(
-            channel=channel_id,
-            ts=loading_msg["ts"]
-        )
+        # Delete the completion message after 30 seconds
+        delete_message_later(client, channel_id, loading_msg["ts"], 30)
         
         logger.info(f"Successfully analyzed thread with {len(relevant_messages)} relevant messages")
         
     except Exception as e:
         logger.error(f"Error processing shortcut: {e}")
-        client.chat_postEphemeral(
+        await client.chat_postEphemeral(
             channel=shortcut["channel"]["id"],
             user=shortcut["user"]["id"],
             text=f"❌ Error analyzing thread: {str(e)}"
         )
 
-# Flask routes
-@flask_app.route("/slack/events", methods=["POST"])
-def slack_events():
+# aiohttp routes
+async def slack_events(request):
     """Handle Slack events"""
-    return handler.handle(request)
+    bolt_request = await to_bolt_request(request)
+    bolt_response = await slack_app.async_dispatch(bolt_request)
+    return await to_aiohttp_response(bolt_response)
 
-@flask_app.route("/", methods=["GET"])
-def health_check():
+async def health_check(request):
     """Health check endpoint"""
-    return "Slack Thread Analyzer is running! 🚀", 200
+    return web.Response(text="Slack Thread Analyzer is running! 🚀", status=200)
+
+async def open_slack_session(app):
+    """Share one pooled HTTP session across this worker's Slack API calls"""
+    slack_app.client.session = ClientSession(connector=TCPConnector(limit=100))
+
+async def close_slack_session(app):
+    """Close the shared Slack API session on shutdown"""
+    await slack_app.client.session.close()
+
+web_app.router.add_post("/slack/events", slack_events)
+web_app.router.add_get("/", health_check)
+web_app.on_startup.append(open_slack_session)
+web_app.on_cleanup.append(close_slack_session)
 
 # For local development
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 3000))
-    flask_app.run(host="0.0.0.0", port=port)
+    web.run_app(web_app, host="0.0.0.0", port=port)
 
-# Expose the Flask app for gunicorn
-app = flask_app
+# Expose the aiohttp app for gunicorn (settings in gunicorn.conf.py)
+app = web_app
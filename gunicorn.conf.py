@@ -0,0 +1,9 @@
+import os
+
+# Serve the aiohttp app with async workers so concurrent shortcuts don't block
+# each other on Slack API round-trips. Preloading builds the Slack app and the
+# keyword matcher once in the parent, shared copy-on-write by every worker.
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+worker_class = "aiohttp.GunicornWebWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+preload_app = True
@@ -0,0 +1,109 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Keywords to search for
+KEYWORDS = [
+    'bug',
+    'issue',
+    'problem',
+    'error',
+    'broken',
+    'not working',
+    'failed',
+    'crash',
+    'incident',
+    'urgent',
+    'rattle',
+    'deflation',
+    'detachment',
+    'faulty',
+    'incorrect',
+    'wrong'
+]
+# Lowercased and de-duplicated, preserving order, so each keyword is reported once
+KEYWORDS_LOWER = tuple(dict.fromkeys(keyword.lower() for keyword in KEYWORDS))
+
+KEYWORD_INDEX = {keyword.encode(): index for index, keyword in enumerate(KEYWORDS_LOWER)}
+MIN_KEYWORD_LENGTH = min(len(keyword) for keyword in KEYWORDS_LOWER)
+
+# Build the keyword matcher once at import so each message is scanned in a
+# single pass. This runs unconditionally (not just under __main__) so gunicorn
+# builds it once per worker, or once in the parent with --preload.
+# Prefer a Hyperscan database, then the Aho-Corasick automaton, and fall back
+# to one alternation regex. The regex is wrapped in a lookahead so matches
+# that overlap (e.g. "issuerror") are all reported; at any one position the
+# longest keyword is tried first.
+# The regex runs over UTF-8 bytes lowered with ASCII_LOWER_TABLE, which is much
+# cheaper than re.IGNORECASE on str. Only ASCII letters are case-folded, so a
+# keyword with non-ASCII letters would only match their lowercase form.
+ASCII_LOWER_TABLE = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
+KEYWORD_DB = None
+AUTOMATON = None
+KEYWORD_RE = None
+if hyperscan is not None:
+    KEYWORD_DB = hyperscan.Database()
+    KEYWORD_DB.compile(
+        expressions=[keyword.encode() for keyword in KEYWORDS_LOWER],
+        ids=list(range(len(KEYWORDS_LOWER))),
+        flags=hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH,
+        literal=True
+    )
+elif ahocorasick is not None:
+    AUTOMATON = ahocorasick.Automaton()
+    for index, keyword in enumerate(KEYWORDS_LOWER):
+        AUTOMATON.add_word(keyword, index)
+    AUTOMATON.make_automaton()
+else:
+    KEYWORD_RE = re.compile(
+        b"(?=(" +
+        b"|".join(re.escape(k.encode()) for k in sorted(KEYWORDS_LOWER, key=len, reverse=True)) +
+        b"))"
+    )
+
+# Hyperscan releases the GIL while scanning, so only it gains from running scans
+# on worker threads. Each thread needs its own Hyperscan scratch space.
+SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=4) if KEYWORD_DB is not None else None
+scratch_spaces = threading.local()
+
+def get_scratch():
+    """Return this thread's Hyperscan scratch space, allocating it on first use"""
+    scratch = getattr(scratch_spaces, "scratch", None)
+    if scratch is None:
+        scratch = scratch_spaces.scratch = hyperscan.Scratch(KEYWORD_DB)
+    return scratch
+
+@lru_cache(maxsize=4096)
+def find_matching_keywords(text):
+    """Find which keywords are present in the text, memoised for repeated messages"""
+    if len(text) < MIN_KEYWORD_LENGTH:
+        return ()
+    if KEYWORD_DB is not None:
+        found = set()
+        # Returning None from the handler tells Hyperscan to keep scanning
+        KEYWORD_DB.scan(
+            text.encode("utf-8", "ignore"),
+            match_event_handler=lambda index, start, end, flags, context: found.add(index),
+            scratch=get_scratch()
+        )
+    elif AUTOMATON is not None:
+        found = {index for _, index in AUTOMATON.iter(text.lower())}
+    else:
+        text_lower = text.encode("utf-8", "ignore").translate(ASCII_LOWER_TABLE)
+        found = {KEYWORD_INDEX[m.group(1)] for m in KEYWORD_RE.finditer(text_lower)}
+    return tuple(KEYWORDS_LOWER[index] for index in sorted(found))
+
+def scan_texts(texts):
+    """Find the matching keywords for each of a list of texts"""
+    return [find_matching_keywords(text) for text in texts]